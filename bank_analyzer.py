@@ -3,69 +3,171 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, time
+from numba import njit
+from dataclasses import dataclass
+from functools import cached_property
+from datetime import datetime
 from typing import Dict, List, Tuple
+from python_calamine import CalamineWorkbook
+import hashlib
+import io
 import json
 
+st.set_page_config(page_title="Bank Statement Analyzer", layout="wide")
+
+DIGITAL_CHANNELS = ('Net Banking Transfer', 'UPI', 'Card')
+PAGE_SIZE = 200  # Rows per page in the flagged-transaction tables
+
+@dataclass(frozen=True, slots=True)
+class FraudThresholds:
+    """Fraud detection limits, shared by reference across analyzer instances."""
+    velocity_limit: int = 5  # Max transactions per hour
+    large_transaction: int = 500_000
+    suspicious_hi: int = 23  # Hours from suspicious_hi through suspicious_lo are unusual
+    suspicious_lo: int = 4
+
+_DEFAULT_THRESHOLDS = FraudThresholds()
+
+def _category_code(series: pd.Series, label: str) -> int:
+    """Return the category code of label, or -2 (matches no row) if absent."""
+    try:
+        return series.cat.categories.get_loc(label)
+    except KeyError:
+        return -2
+
+@njit(cache=True)
+def _unusual_time_mask(hrs, lo, hi):
+    """Flag hours at or after hi or at or before lo; hours of -1 (missing) never match."""
+    out = np.empty(hrs.size, np.bool_)
+    for i in range(hrs.size):
+        h = hrs[i]
+        out[i] = (h >= 0) & ((h >= hi) | (h <= lo))
+    return out
+
+def _to_cents(amounts: np.ndarray) -> np.ndarray:
+    """Convert rupee amounts to integer paise, rounding away float error."""
+    return np.rint(amounts * 100).astype(np.int64)
+
+def _repeated_mask(values: np.ndarray, min_count: int) -> np.ndarray:
+    """Return a mask of the entries whose value occurs at least min_count times."""
+    unique, counts = np.unique(values, return_counts=True)
+    return np.isin(values, unique[counts >= min_count])
+
 class BankAnalyzer:
-    def __init__(self, transactions_df: pd.DataFrame):
+    def __init__(self, transactions_df: pd.DataFrame,
+                 fraud_thresholds: FraudThresholds = _DEFAULT_THRESHOLDS):
         self.transactions_df = transactions_df
-        self.fraud_thresholds = {
-            'velocity_limit': 5,  # Max transactions per hour
-            'large_transaction': 500000,
-            'suspicious_time_start': time(23, 0),
-            'suspicious_time_end': time(4, 0)
+        self.fraud_thresholds = fraud_thresholds
+
+    # Per-frame lookups are resolved lazily, so each analysis only pays for what it uses
+
+    @cached_property
+    def _credit_code(self) -> int:
+        return _category_code(self.transactions_df['Transaction Type'], 'Credit')
+
+    @cached_property
+    def _debit_code(self) -> int:
+        return _category_code(self.transactions_df['Transaction Type'], 'Debit')
+
+    @cached_property
+    def _digital_codes(self) -> np.ndarray:
+        """Category codes of the digital channels present in this statement."""
+        channels = self.transactions_df['Transaction Channel'].cat
+        return np.array(
+            [channels.categories.get_loc(c) for c in DIGITAL_CHANNELS if c in channels.categories],
+            dtype=channels.codes.dtype
+        )
+
+    @cached_property
+    def _stats(self) -> Dict:
+        """Scalar statistics shared by the Overview tab and analyze_opportunities.
+
+        Blank cells are skipped as pandas' skipna would, and a statement without
+        balances reports NaN rather than failing.
+        """
+        transactions_df = self.transactions_df
+        balances = transactions_df['Balance'].to_numpy(dtype=np.float64)
+        balances = balances[~np.isnan(balances)]
+        return {
+            'avg_balance': float(balances.mean()) if balances.size else np.nan,
+            'max_balance': float(balances.max()) if balances.size else np.nan,
+            'total_amount': float(np.nansum(transactions_df['Amount'].values)),
+            'n': len(transactions_df)
         }
 
-    def analyze_patterns(self) -> Dict:
-        """Analyze transaction patterns."""
-        credits = self.transactions_df[self.transactions_df['Transaction Type'].str.strip() == 'Credit']
-        debits = self.transactions_df[self.transactions_df['Transaction Type'].str.strip() == 'Debit']
+    def summary(self) -> Dict:
+        """Return account statistics, computed once per analyzer."""
+        return self._stats
 
-        # Regular income patterns
-        regular_income = credits.groupby('Amount').filter(lambda x: len(x) >= 3)
+    def analyze_patterns(self) -> Dict:
+        """Analyze transaction patterns.
+
+        Matching transactions are returned as positional indices into
+        ``transactions_df``; callers materialize rows with ``.iloc`` as needed.
+        """
+        type_codes = self.transactions_df['Transaction Type'].cat.codes.to_numpy()
+        amounts = self.transactions_df['Amount'].to_numpy(dtype=np.float64)
+        has_amount = ~np.isnan(amounts)
+        credit_idx = np.where((type_codes == self._credit_code) & has_amount)[0]
+        debit_idx = np.where((type_codes == self._debit_code) & has_amount)[0]
+
+        # Regular income patterns: credit amounts seen at least three times
+        regular_income_mask = _repeated_mask(_to_cents(amounts[credit_idx]), 3)
         
-        # Recurring expenses
-        recurring_expenses = debits.groupby('Amount').filter(lambda x: len(x) >= 2)
+        # Recurring expenses: debit amounts seen at least twice
+        recurring_expenses_mask = _repeated_mask(_to_cents(amounts[debit_idx]), 2)
 
         return {
-            'regular_income': regular_income,
-            'recurring_expenses': recurring_expenses,
-            'income_count': len(regular_income),
-            'expenses_count': len(recurring_expenses)
+            'regular_income_idx': credit_idx[regular_income_mask],
+            'recurring_expenses_idx': debit_idx[recurring_expenses_mask],
+            'income_count': int(regular_income_mask.sum()),
+            'expenses_count': int(recurring_expenses_mask.sum())
         }
 
     def detect_fraud(self) -> Dict:
-        """Detect potential fraud indicators."""
-        # High velocity transactions
-        self.transactions_df['Hour'] = self.transactions_df['Date'].dt.strftime('%Y-%m-%d-%H')
-        velocity_groups = self.transactions_df.groupby('Hour').filter(
-            lambda x: len(x) > self.fraud_thresholds['velocity_limit']
+        """Detect potential fraud indicators.
+
+        Flagged transactions are returned as positional indices into
+        ``transactions_df``.
+        """
+        # Work on local arrays only; transactions_df is shared with the other
+        # analyses and is never written to
+        dates = self.transactions_df['Date']
+        hour_bucket = dates.to_numpy(
+            dtype='datetime64[ns]', na_value=np.datetime64('NaT')
+        ).astype('datetime64[h]')
+        hrs = dates.dt.hour.to_numpy(dtype=np.int64, na_value=-1)
+
+        # High velocity transactions: count transactions per calendar hour
+        counts = pd.Series(hour_bucket).groupby(hour_bucket).transform('size')
+        mask_velocity = counts.values > self.fraud_thresholds.velocity_limit
+
+        # Unusual timing transactions, compared on the integer hour of day
+        mask_time = _unusual_time_mask(
+            hrs, self.fraud_thresholds.suspicious_lo, self.fraud_thresholds.suspicious_hi
         )
 
-        # Unusual timing transactions
-        self.transactions_df['time'] = self.transactions_df['Date'].dt.time
-        unusual_timing = self.transactions_df[
-            (self.transactions_df['time'] >= self.fraud_thresholds['suspicious_time_start']) |
-            (self.transactions_df['time'] <= self.fraud_thresholds['suspicious_time_end'])
-        ]
+        high_velocity_idx = np.where(mask_velocity)[0]
+        unusual_timing_idx = np.where(mask_time)[0]
 
         return {
-            'high_velocity': velocity_groups,
-            'unusual_timing': unusual_timing,
-            'alerts_count': len(velocity_groups) + len(unusual_timing)
+            'high_velocity_idx': high_velocity_idx,
+            'unusual_timing_idx': unusual_timing_idx,
+            'alerts_count': len(high_velocity_idx) + len(unusual_timing_idx)
         }
 
     def analyze_opportunities(self) -> Dict:
         """Identify business opportunities."""
-        avg_balance = self.transactions_df['Balance'].mean()
-        max_balance = self.transactions_df['Balance'].max()
+        avg_balance = self._stats['avg_balance']
+        max_balance = self._stats['max_balance']
         
-        digital_channels = ['Net Banking Transfer', 'UPI', 'Card']
-        digital_txns = self.transactions_df[
-            self.transactions_df['Transaction Channel'].isin(digital_channels)
-        ]
-        digital_ratio = len(digital_txns) / len(self.transactions_df)
+        # Only the ratio is needed, so count matches without building a filtered frame,
+        # and skip the scan entirely when the statement has no digital channels
+        if self._digital_codes.size:
+            channel_codes = self.transactions_df['Transaction Channel'].cat.codes.values
+            digital_ratio = np.isin(channel_codes, self._digital_codes).mean()
+        else:
+            digital_ratio = 0.0
 
         opportunities = {
             'cross_sell': [],
@@ -97,33 +199,88 @@ class BankAnalyzer:
 
         return opportunities
 
-def process_excel(uploaded_file) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Process uploaded Excel file and return transaction and balance DataFrames."""
+def _read_sheet(workbook: CalamineWorkbook, sheet_name: str) -> pd.DataFrame:
+    """Read a worksheet into a DataFrame, treating blank cells as missing.
+
+    Mirrors ``pd.read_excel``: the first row is the header and blank header
+    cells are named ``Unnamed: N``.
+    """
+    rows = workbook.get_sheet_by_name(sheet_name).to_python()
+    if not rows:
+        raise ValueError(f"Sheet '{sheet_name}' is empty")
+    header = [f'Unnamed: {i}' if name == '' else name for i, name in enumerate(rows[0])]
+    frame = pd.DataFrame(rows[1:], columns=header)
+
+    # calamine reports blank cells as ''; only text columns can hold them
+    text = frame.select_dtypes(include=['object', 'string']).columns
+    frame[text] = frame[text].mask(frame[text] == '')
+    return frame.infer_objects()
+
+# The analyses are cached on the upload digest; the frame itself is not hashed
+
+@st.cache_data(show_spinner=False)
+def _summary(file_digest: str, _transactions_df: pd.DataFrame) -> Dict:
+    """Cached wrapper around BankAnalyzer.summary."""
+    return BankAnalyzer(_transactions_df).summary()
+
+@st.cache_data(show_spinner=False)
+def _analyze_patterns(file_digest: str, _transactions_df: pd.DataFrame) -> Dict:
+    """Cached wrapper around BankAnalyzer.analyze_patterns."""
+    return BankAnalyzer(_transactions_df).analyze_patterns()
+
+@st.cache_data(show_spinner=False)
+def _detect_fraud(file_digest: str, _transactions_df: pd.DataFrame) -> Dict:
+    """Cached wrapper around BankAnalyzer.detect_fraud."""
+    return BankAnalyzer(_transactions_df).detect_fraud()
+
+@st.cache_data(show_spinner=False)
+def _analyze_opportunities(file_digest: str, _transactions_df: pd.DataFrame) -> Dict:
+    """Cached wrapper around BankAnalyzer.analyze_opportunities."""
+    return BankAnalyzer(_transactions_df).analyze_opportunities()
+
+@st.cache_data(show_spinner=False)
+def process_excel(file_digest: str, _file_bytes: bytes) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Process uploaded Excel file and return transaction and balance DataFrames.
+
+    Results are cached on ``file_digest``; the raw bytes are not hashed.
+    """
     try:
+        # Open the workbook once; both sheets are read from the same parsed container
+        workbook = CalamineWorkbook.from_filelike(io.BytesIO(_file_bytes))
+
         # Read transactions
-        transactions_df = pd.read_excel(uploaded_file, sheet_name='Transactions', engine='openpyxl')
-        transactions_df['Date'] = pd.to_datetime(transactions_df['Date'])
+        transactions_df = _read_sheet(workbook, 'Transactions')
+        # Arrow-backed timestamps let the .dt accessors run on Arrow compute kernels
+        transactions_df['Date'] = pd.to_datetime(transactions_df['Date']).astype('timestamp[ns][pyarrow]')
+        transactions_df['Transaction Type'] = transactions_df['Transaction Type'].str.strip().astype('category')
+        transactions_df['Transaction Channel'] = transactions_df['Transaction Channel'].astype('category')
+        # Amount and Balance deliberately stay float64: pandas downcasts to float32
+        # whenever values agree within 5e-4, which shows 1234.56 as 1234.5600586 and
+        # lets summed totals drift by paise
         
         # Read and process balance data
         try:
-            balance_df = pd.read_excel(uploaded_file, sheet_name='Daily EOD Balances', engine='openpyxl')
-            
-            # Melt the balance dataframe to get it in the correct format for plotting
-            # First, ensure Day/Month is the index
-            balance_df.set_index('Day/Month', inplace=True)
+            balance_sheet = _read_sheet(workbook, 'Daily EOD Balances')
             
-            # Melt the dataframe to convert columns to rows
-            balance_df = balance_df.reset_index().melt(
-                id_vars=['Day/Month'],
-                var_name='Month',
-                value_name='Balance'
-            )
-            
-            # Convert Month column to datetime
-            balance_df['Month'] = pd.to_datetime(balance_df['Month'])
+            # The sheet is a days x months matrix; flattening it column-major next to
+            # tiled days and repeated months gives the long format without a melt.
+            # Rows without a numeric day (e.g. a trailing label row) are dropped and
+            # blank or text cells become NaN, so the flattened body stays float
+            days = pd.to_numeric(balance_sheet['Day/Month'], errors='coerce')
+            balance_sheet = balance_sheet[days.notna().to_numpy()]
+            days = pd.to_numeric(days.dropna(), downcast='integer').to_numpy()
+            body = balance_sheet.drop(columns='Day/Month').apply(pd.to_numeric, errors='coerce')
+            # Columns without a month label (blank spacer columns) cannot be plotted
+            body = body.loc[:, ~body.columns.astype(str).str.startswith('Unnamed: ')]
+            months = pd.to_datetime(pd.Series(body.columns))
+            balance_df = pd.DataFrame({
+                'Day/Month': np.tile(days, len(months)),
+                'Month': np.repeat(months.to_numpy(), len(days)),
+                'Balance': body.to_numpy(dtype=np.float64, na_value=np.nan).ravel(order='F')
+            })
             
             # Sort by Month and Day/Month
-            balance_df = balance_df.sort_values(['Month', 'Day/Month'])
+            balance_df = balance_df.sort_values(['Month', 'Day/Month'], ignore_index=True)
             
         except Exception as e:
             st.warning(f"Could not process balance data: {str(e)}")
@@ -134,9 +291,18 @@ def process_excel(uploaded_file) -> Tuple[pd.DataFrame, pd.DataFrame]:
         st.error(f"Error reading Excel file: {str(e)}")
         raise e
 
-# Streamlit UI
-st.set_page_config(page_title="Bank Statement Analyzer", layout="wide")
+def _show_rows_paginated(transactions_df: pd.DataFrame, idx: np.ndarray, key: str):
+    """Render the rows at positions idx one page at a time, materializing only that page."""
+    pages = (len(idx) - 1) // PAGE_SIZE + 1
+    page = 1
+    if pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=key)
+    start = (page - 1) * PAGE_SIZE
+    page_idx = idx[start:start + PAGE_SIZE]
+    st.dataframe(transactions_df.iloc[page_idx])
+    st.caption(f"Showing {start + 1}-{start + len(page_idx)} of {len(idx)}")
 
+# Streamlit UI
 st.title("Bank Statement Analysis Dashboard")
 
 # File upload
@@ -145,9 +311,10 @@ uploaded_file = st.file_uploader("Upload your bank statement", type=['xlsx'])
 if uploaded_file is not None:
     try:
         with st.spinner('Processing your statement...'):
-            # Process the file
-            transactions_df, balance_df = process_excel(uploaded_file)
-            analyzer = BankAnalyzer(transactions_df)
+            # Process the file; reruns with the same upload hit the cache
+            file_bytes = uploaded_file.getvalue()
+            file_digest = hashlib.sha256(file_bytes).hexdigest()
+            transactions_df, balance_df = process_excel(file_digest, file_bytes)
 
             # Create tabs for different analyses
             tab1, tab2, tab3, tab4 = st.tabs([
@@ -161,15 +328,18 @@ if uploaded_file is not None:
                 
                 # Balance trend
                 if not balance_df.empty:
-                    fig = px.line(
-                        balance_df, 
-                        x='Month',
-                        y='Balance',
-                        color='Day/Month',
-                        title='Daily Balance Trend Across Months'
-                    )
+                    # One WebGL trace per day of month, built straight from the arrays
+                    fig = go.Figure()
+                    for day, grp in balance_df.groupby('Day/Month', sort=True):
+                        fig.add_trace(go.Scattergl(
+                            x=grp['Month'].values,
+                            y=grp['Balance'].values,
+                            mode='lines',
+                            name=str(day)
+                        ))
                     # Update layout for better readability
                     fig.update_layout(
+                        title='Daily Balance Trend Across Months',
                         xaxis_title="Month",
                         yaxis_title="Balance (₹)",
                         showlegend=True,
@@ -178,18 +348,19 @@ if uploaded_file is not None:
                     st.plotly_chart(fig, use_container_width=True)
 
                 # Basic stats
+                stats = _summary(file_digest, transactions_df)
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Total Transactions", len(transactions_df))
+                    st.metric("Total Transactions", stats['n'])
                 with col2:
-                    st.metric("Average Balance", f"₹{transactions_df['Balance'].mean():,.2f}")
+                    st.metric("Average Balance", f"₹{stats['avg_balance']:,.2f}")
                 with col3:
-                    st.metric("Total Volume", f"₹{transactions_df['Amount'].sum():,.2f}")
+                    st.metric("Total Volume", f"₹{stats['total_amount']:,.2f}")
 
             # Tab 2: Transaction Patterns
             with tab2:
                 st.header("Transaction Patterns")
-                patterns = analyzer.analyze_patterns()
+                patterns = _analyze_patterns(file_digest, transactions_df)
 
                 # Pattern metrics
                 col1, col2 = st.columns(2)
@@ -209,15 +380,17 @@ if uploaded_file is not None:
             # Tab 3: Fraud Indicators
             with tab3:
                 st.header("Fraud Detection")
-                fraud_indicators = analyzer.detect_fraud()
+                fraud_indicators = _detect_fraud(file_digest, transactions_df)
 
-                if len(fraud_indicators['high_velocity']) > 0:
-                    st.warning(f"⚠️ High velocity transactions detected: {len(fraud_indicators['high_velocity'])} instances")
-                    st.dataframe(fraud_indicators['high_velocity'])
+                high_velocity_idx = fraud_indicators['high_velocity_idx']
+                if len(high_velocity_idx) > 0:
+                    st.warning(f"⚠️ High velocity transactions detected: {len(high_velocity_idx)} instances")
+                    _show_rows_paginated(transactions_df, high_velocity_idx, key='high_velocity_page')
 
-                if len(fraud_indicators['unusual_timing']) > 0:
-                    st.warning(f"⚠️ Unusual timing transactions detected: {len(fraud_indicators['unusual_timing'])} instances")
-                    st.dataframe(fraud_indicators['unusual_timing'])
+                unusual_timing_idx = fraud_indicators['unusual_timing_idx']
+                if len(unusual_timing_idx) > 0:
+                    st.warning(f"⚠️ Unusual timing transactions detected: {len(unusual_timing_idx)} instances")
+                    _show_rows_paginated(transactions_df, unusual_timing_idx, key='unusual_timing_page')
 
                 if fraud_indicators['alerts_count'] == 0:
                     st.success("No suspicious activities detected")
@@ -225,7 +398,7 @@ if uploaded_file is not None:
             # Tab 4: Business Opportunities
             with tab4:
                 st.header("Business Opportunities")
-                opportunities = analyzer.analyze_opportunities()
+                opportunities = _analyze_opportunities(file_digest, transactions_df)
 
                 # Cross-sell opportunities
                 st.subheader("Cross-Sell Recommendations")